@@ -0,0 +1,101 @@
+"""
+Módulo de búsqueda de palabras clave para el servicio de IA de UniShop.
+Detecta en una sola pasada qué grupos de palabras clave aparecen en un texto.
+"""
+
+import re
+import logging
+from typing import Dict, Iterable, Optional, Pattern, Set
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    logging.warning("pyahocorasick no disponible. Usando búsqueda de palabras clave en Python puro.")
+
+class KeywordMatcher:
+    """
+    Busca grupos de palabras clave como subcadenas de un texto.
+    Con pyahocorasick todas las palabras se compilan en un autómata Aho-Corasick,
+    de modo que el texto se recorre una sola vez sin importar cuántas palabras haya.
+    Con whole_words=True solo cuentan coincidencias que no estén pegadas a otra letra o dígito
+    (por ejemplo "ingle" no coincide dentro de "inglés").
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], whole_words: bool = False):
+        self.groups = {group: tuple(keywords) for group, keywords in groups.items()}
+        self.whole_words = whole_words
+        self._automaton = None
+        self._patterns = {}
+
+        if AHOCORASICK_AVAILABLE:
+            # Una misma palabra puede pertenecer a varios grupos
+            keyword_groups: Dict[str, Set[str]] = {}
+            for group, keywords in self.groups.items():
+                for keyword in keywords:
+                    keyword_groups.setdefault(keyword, set()).add(group)
+
+            if keyword_groups:
+                automaton = ahocorasick.Automaton()
+                for keyword, owners in keyword_groups.items():
+                    automaton.add_word(keyword, (len(keyword), frozenset(owners)))
+                automaton.make_automaton()
+                self._automaton = automaton
+        elif whole_words:
+            # Sin autómata: una expresión regular por grupo con límites de palabra
+            self._patterns = {
+                group: re.compile(
+                    r"(?<!\w)(?:" + "|".join(map(re.escape, keywords)) + r")(?!\w)"
+                )
+                for group, keywords in self.groups.items() if keywords
+            }
+
+    def match(self, text: str) -> Set[str]:
+        """
+        Detecta los grupos con al menos una palabra clave presente en el texto.
+
+        Args:
+            text: Texto donde buscar (se compara tal cual, sin normalizar)
+
+        Returns:
+            Conjunto con los nombres de los grupos encontrados
+        """
+        if self._automaton is not None:
+            hits: Set[str] = set()
+            for end, (length, owners) in self._automaton.iter(text):
+                if self.whole_words and not self._is_whole_word(text, end - length + 1, end):
+                    continue
+                hits |= owners
+            return hits
+
+        if self.whole_words:
+            return {group for group, pattern in self._patterns.items() if pattern.search(text)}
+
+        return {
+            group for group, keywords in self.groups.items()
+            if any(keyword in text for keyword in keywords)
+        }
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        """Indica si text[start:end + 1] no está pegado a otro carácter de palabra."""
+        before = text[start - 1] if start > 0 else " "
+        after = text[end + 1] if end + 1 < len(text) else " "
+        return not (before.isalnum() or before == "_" or after.isalnum() or after == "_")
+
+def compile_keyword_groups(groups: Dict[str, Iterable[str]]) -> Pattern[str]:
+    """
+    Compila los grupos en una sola alternancia, con un grupo con nombre por clave.
+    Cada grupo va dentro de una búsqueda anticipada de ancho cero: las coincidencias no
+    consumen texto, así una palabra de menor prioridad no oculta otra que se solapa con ella.
+    """
+    return re.compile("|".join(
+        f"(?=(?P<{name}>{'|'.join(re.escape(k) for k in sorted(keywords, key=lambda k: (-len(k), k)))}))"
+        for name, keywords in groups.items()
+    ))
+
+def first_matching_group(pattern: Pattern[str], groups: Dict[str, Iterable[str]], text: str) -> Optional[str]:
+    """Recorre el texto una vez y devuelve el primer grupo (en orden de prioridad) que aparece"""
+    found = {match.lastgroup for match in pattern.finditer(text)}
+    return next((name for name in groups if name in found), None)
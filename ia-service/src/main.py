@@ -1,68 +1,193 @@
 import os
+import time
+import asyncio
+import heapq
 import logging
-from typing import List, Dict, Any
-from fastapi import FastAPI, HTTPException
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import httpx
+import orjson
+from pydantic import BaseModel
 
-# Importar clasificador semántico
+# Importar clasificador semántico y buscador de palabras clave
 try:
-    from .semantic_classifier import semantic_classifier
+    from .semantic_classifier import get_semantic_classifier
+    from .keyword_matcher import KeywordMatcher, compile_keyword_groups, first_matching_group
 except ImportError:
     # Fallback for running in container
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from semantic_classifier import semantic_classifier
+    from semantic_classifier import get_semantic_classifier
+    from keyword_matcher import KeywordMatcher, compile_keyword_groups, first_matching_group
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Unishop IA Service", version="0.3.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Configuración
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8080")
+# HTTP/2 hacia el backend (se negocia por ALPN, así que solo aplica si BACKEND_URL es https)
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "true").lower() == "true"
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "60"))
+# Orígenes permitidos por CORS separados por comas; vacío desactiva CORS (solo llamadas entre servicios)
+CORS_ALLOWED_ORIGINS = [
+    origin.strip() for origin in os.getenv("CORS_ALLOWED_ORIGINS", "*").split(",") if origin.strip()
+]
+
+# Caché en memoria del catálogo de productos (se refresca al expirar el TTL)
+_catalog_cache: Dict[str, Any] = {
+    "products": [],
+    "by_id": {},
+    "by_category": {},
+    "books": [],
+    "most_expensive": None,
+    "cheapest": None,
+    "expires": 0.0,
+}
+# Descarga del catálogo en curso; las corrutinas concurrentes esperan su resultado (éxito o fallo)
+_catalog_refresh: Optional["asyncio.Task[Optional[List[Dict[str, Any]]]]"] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Mantiene un único cliente HTTP (con keep-alive) hacia el backend durante la vida del servicio"""
+    app.state.http = httpx.AsyncClient(
+        base_url=BACKEND_URL,
+        http2=BACKEND_HTTP2,
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(
+    title="Unishop IA Service",
+    version="0.3.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
-async def get_products_from_backend() -> List[Dict[str, Any]]:
-    """Obtiene la lista de productos del backend"""
+if CORS_ALLOWED_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+# Comprime las respuestas grandes (listas de productos); las pequeñas se envían tal cual
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+async def _fetch_products_from_backend() -> Optional[List[Dict[str, Any]]]:
+    """Descarga la lista completa de productos del backend; None si la petición falla"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{BACKEND_URL}/api/v1/products")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Error obteniendo productos: {response.status_code}")
-                return []
+        response = await app.state.http.get("/api/v1/products")
+        if response.status_code == 200:
+            return orjson.loads(response.content)
+        else:
+            logger.error(f"Error obteniendo productos: {response.status_code}")
+            return None
     except Exception as e:
         logger.error(f"Error de conexión con backend: {e}")
-        return []
+        return None
+
+def _index_catalog(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Construye en una sola pasada los índices del catálogo: por ID, por categoría,
+    la lista de libros y los productos de mayor y menor precio.
+    """
+    by_id: Dict[Any, Dict[str, Any]] = {}
+    by_category: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    books: List[Dict[str, Any]] = []
+    most_expensive, max_price = None, None
+    cheapest, min_price = None, None
+
+    for p in products:
+        category = p.get("categoryName") or ""
+        # Un precio nulo o no numérico no debe romper la indexación del catálogo
+        price = p.get("price") or 0
+        if not isinstance(price, (int, float)):
+            price = 0
+
+        by_id[p.get("id")] = p
+        by_category[category].append(p)
+        if category.lower() == "libros":
+            books.append(p)
+
+        if most_expensive is None or price > max_price:
+            most_expensive, max_price = p, price
+        # Se excluyen productos con precio 0 para evitar productos gratuitos
+        if price > 0 and (cheapest is None or price < min_price):
+            cheapest, min_price = p, price
+
+    return {
+        "products": products,
+        "by_id": by_id,
+        "by_category": dict(by_category),
+        "books": books,
+        "most_expensive": most_expensive,
+        "cheapest": cheapest,
+    }
+
+def _catalog_is_fresh() -> bool:
+    return _catalog_cache["expires"] > time.monotonic()
+
+async def _refresh_catalog() -> Optional[List[Dict[str, Any]]]:
+    """Descarga el catálogo y, si la petición tuvo éxito (aunque venga vacío), lo indexa en caché"""
+    products = await _fetch_products_from_backend()
+    if products is not None:
+        _catalog_cache.update(_index_catalog(products))
+        _catalog_cache["expires"] = time.monotonic() + CATALOG_TTL_SECONDS
+    return products
+
+async def get_products_from_backend() -> List[Dict[str, Any]]:
+    """
+    Obtiene la lista de productos del backend, servida desde caché mientras no expire el TTL.
+    Las consultas concurrentes con la caché vencida esperan una única petición al backend
+    y comparten su resultado, también cuando falla.
+    """
+    global _catalog_refresh
+
+    if _catalog_is_fresh():
+        return _catalog_cache["products"]
+
+    if _catalog_refresh is None or _catalog_refresh.done():
+        _catalog_refresh = asyncio.create_task(_refresh_catalog())
+
+    # shield: si se cancela una petición del cliente, la descarga sigue para los demás
+    products = await asyncio.shield(_catalog_refresh)
+    return products or []
 
 async def get_product_from_backend(product_id: int) -> Dict[str, Any]:
-    """Obtiene un producto específico del backend"""
+    """Obtiene un producto específico, usando el catálogo en caché si está vigente"""
+    if _catalog_is_fresh():
+        product = _catalog_cache["by_id"].get(product_id)
+        if product:
+            return product
+
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{BACKEND_URL}/api/v1/products/{product_id}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Error obteniendo producto {product_id}: {response.status_code}")
-                return None
+        response = await app.state.http.get(f"/api/v1/products/{product_id}")
+        if response.status_code == 200:
+            return orjson.loads(response.content)
+        else:
+            logger.error(f"Error obteniendo producto {product_id}: {response.status_code}")
+            return None
     except Exception as e:
         logger.error(f"Error de conexión con backend: {e}")
         return None
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "service": "ia-service"}
+# Cuerpo precalculado: las sondas de salud no pasan por serialización JSON
+HEALTH_RESPONSE_BODY = b'{"status":"healthy","service":"ia-service"}'
+
+@app.get("/health", include_in_schema=False)
+async def health_check() -> Response:
+    return Response(content=HEALTH_RESPONSE_BODY, media_type="application/json")
 
 @app.get("/")
 async def root():
@@ -75,8 +200,8 @@ async def get_popular_recommendations() -> Dict[str, List[Dict[str, Any]]]:
     """
     all_products = await get_products_from_backend()
 
-    # Ordenar por ID descendente (productos más recientes primero)
-    popular = sorted(all_products, key=lambda x: x.get("id", 0), reverse=True)[:10]
+    # Los 10 IDs más altos (productos más recientes primero), sin ordenar todo el catálogo
+    popular = heapq.nlargest(10, all_products, key=lambda x: x.get("id", 0))
 
     return {"popular": popular}
 
@@ -85,313 +210,449 @@ async def get_recommendations(product_id: int) -> Dict[str, List[Dict[str, Any]]
     """
     Obtiene recomendaciones de productos relacionados basadas en categoría
     """
-    # Obtener el producto objetivo
-    product = await get_product_from_backend(product_id)
+    # Obtener el producto objetivo y el catálogo en paralelo
+    product, all_products = await asyncio.gather(
+        get_product_from_backend(product_id),
+        get_products_from_backend(),
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-    # Obtener todos los productos
-    all_products = await get_products_from_backend()
-
-    # Filtrar productos de la misma categoría, excluyendo el producto actual
-    category = product.get("categoryName", "")
-    recommendations = [
-        p for p in all_products
-        if p.get("categoryName", "") == category and p["id"] != product_id
-    ][:5]  # Limitar a 5 recomendaciones
+    # Productos de la misma categoría (índice precalculado), excluyendo el producto actual
+    category = product.get("categoryName") or ""
+    candidates = _catalog_cache["by_category"].get(category, []) if all_products else []
+    recommendations = [p for p in candidates if p["id"] != product_id][:5]  # Limitar a 5 recomendaciones
 
     return {"recommendations": recommendations}
 
-@app.post("/api/v1/chatbot/message")
-async def chatbot_message(message: Dict[str, str]) -> Dict[str, str]:
-    """
-    Procesa mensajes del chatbot con respuestas predefinidas basadas en reglas
-    """
-    user_message = message.get("message", "").lower().strip()
+# Grupos de palabras clave del chatbot; se buscan todos en una sola pasada sobre el mensaje
+CHAT_KEYWORD_GROUPS = {
+    "saludo": frozenset({"hola", "hi", "hello", "saludos", "buenos", "buen", "hey", "qué", "como", "ayuda"}),
+    "compra": frozenset({"comprar", "compra", "adquirir", "cómo compro", "como compro"}),
+    "material_estudio": frozenset({"libro", "libros", "texto", "material", "estudiar"}),
+    "precio": frozenset({"precio", "costo", "cuánto", "vale"}),
+    "envio": frozenset({"envio", "entrega", "envío", "llegar"}),
+    "cuenta": frozenset({"cuenta", "registro", "registrar", "crear"}),
+    "contacto": frozenset({"contactar", "whatsapp", "contacto"}),
+    "favoritos": frozenset({"favorito", "favoritos", "guardar"}),
+    "venta": frozenset({"publicar", "vender", "venta"}),
+    "busqueda": frozenset({"buscar", "encontrar", "filtros"}),
+    "seguridad": frozenset({"seguridad", "seguro", "confianza"}),
+    "equipo_laboratorio": frozenset({"laboratorio", "equipo", "equipos", "instrumental", "instrumentales", "material", "materiales", "útil", "útiles"}),
+    "actividad_laboratorio": frozenset({"práctica", "prácticas", "experimento", "experimentos", "clase", "clases", "laboratorio"}),
+    "empleabilidad": frozenset({"pasantía", "práctica", "empleo", "trabajo", "profesional"}),
+    "investigacion": frozenset({"tesis", "investigación", "proyecto", "grado", "monografía"}),
+    "mas_caro": frozenset({"caro", "costoso", "más caro", "más costoso"}),
+    "mas_barato": frozenset({"barato", "barata", "económico", "económica", "más barato", "más barata", "más económico", "más económica"}),
+    "libros": frozenset({"libro", "libros", "texto", "manual", "aprender", "estudiar", "curso"}),
+}
+chat_keyword_matcher = KeywordMatcher(CHAT_KEYWORD_GROUPS)
+
+# Palabras clave para identificar la carrera en consultas de equipos de laboratorio
+CAREER_KEYWORDS = {
+    "enfermeria": frozenset({"enfermería", "enfermera", "cuidados"}),
+    "medicina": frozenset({"medicina", "médico", "clínica"}),
+    "odontologia": frozenset({"odontología", "odontólogo", "dental"}),
+    "ingenieria": frozenset({"ingeniería", "software", "computación"}),
+    "derecho": frozenset({"derecho", "jurídico", "abogado"}),
+}
+
+# Temas frecuentes para la búsqueda de libros por palabras clave
+BOOK_TOPIC_KEYWORDS = {
+    "musculoesqueletico": frozenset({"músculo", "muscular", "esquelet", "esqueleto", "ortoped", "traumatolog", "kinesiolog"}),
+    "programacion": frozenset({"python", "programacion", "desarrollo", "software", "algoritmo"}),
+}
+
+CAREER_PATTERN = compile_keyword_groups(CAREER_KEYWORDS)
+BOOK_TOPIC_PATTERN = compile_keyword_groups(BOOK_TOPIC_KEYWORDS)
+
+# Nombres de categorías más amigables para estudiantes UCC
+CATEGORY_DISPLAY_NAMES = {
+    "medicina": "medicina",
+    "enfermeria": "enfermería",
+    "odontologia": "odontología",
+    "ingenieria_software": "ingeniería de software",
+    "derecho": "derecho",
+    "matematicas": "matemáticas",
+    "administracion": "administración"
+}
+
+# Respuestas predefinidas del chatbot
+BUY_RESPONSE = (
+    "¡Hola! 👋 **Para comprar en UniShop:**\n\n"
+    "1. 🔍 **Busca productos** usando la barra de búsqueda\n"
+    "2. 🎯 **Filtra** por categoría, precio o condición\n"
+    "3. 💬 **Contacta al vendedor** directamente por WhatsApp\n"
+    "4. 🤝 **Coordina** entrega y pago de forma segura\n\n"
+    "¿Qué tipo de producto buscas? *(libros, equipos, material académico...)*"
+)
 
-    # Respuestas conversacionales y contextuales para estudiantes UCC
-    if any(word in user_message for word in ["hola", "hi", "hello", "saludos", "buenos", "buen", "hey", "qué", "como", "ayuda"]):
-        # Respuestas más contextuales y conversacionales
-        if any(word in user_message for word in ["comprar", "compra", "adquirir", "cómo compro", "como compro"]):
-            response = "¡Hola! 👋 **Para comprar en UniShop:**\n\n"
-            response += "1. 🔍 **Busca productos** usando la barra de búsqueda\n"
-            response += "2. 🎯 **Filtra** por categoría, precio o condición\n"
-            response += "3. 💬 **Contacta al vendedor** directamente por WhatsApp\n"
-            response += "4. 🤝 **Coordina** entrega y pago de forma segura\n\n"
-            response += "¿Qué tipo de producto buscas? *(libros, equipos, material académico...)*"
-
-        elif any(word in user_message for word in ["libro", "libros", "texto", "material", "estudiar"]):
-            response = "¡Hola! 📚 Como estudiante de la UCC, puedo ayudarte con material académico:\n\n"
-            response += "• **Libros de texto** por carrera\n"
-            response += "• **Material de investigación**\n"
-            response += "• **Recursos académicos**\n\n"
-            response += "¿Qué carrera estudias? (Ingeniería, Enfermería, Medicina, Odontología, Derecho...)\n"
-            response += "O dime qué asignatura necesitas."
-
-        elif len(user_message.split()) <= 3:  # Saludos simples
-            response = "¡Hola! 👋 **Soy UniBot**, el asistente inteligente de UniShop para estudiantes de la UCC.\n\n"
-            response += "Puedo ayudarte con:\n"
-            response += "• 🔍 **Buscar libros** y material académico por carrera\n"
-            response += "• 🛠️ **Encontrar equipos** de laboratorio y útiles\n"
-            response += "• 💼 **Preparación profesional** y empleabilidad\n"
-            response += "• 📱 **Navegar** y usar la plataforma UniShop\n\n"
-            response += "*¿En qué te puedo ayudar hoy?*"
-
-        else:  # Saludos con más contexto
-            response = "¡Hola! 👋 ¿En qué puedo ayudarte?\n\n"
-            response += "Como asistente especializado en la comunidad UCC, te ayudo con:\n"
-            response += "• Material académico por carrera\n"
-            response += "• Equipos para prácticas\n"
-            response += "• Consejos para estudiantes\n"
-            response += "• Navegación en UniShop"
+STUDY_MATERIAL_GREETING_RESPONSE = (
+    "¡Hola! 📚 Como estudiante de la UCC, puedo ayudarte con material académico:\n\n"
+    "• **Libros de texto** por carrera\n"
+    "• **Material de investigación**\n"
+    "• **Recursos académicos**\n\n"
+    "¿Qué carrera estudias? (Ingeniería, Enfermería, Medicina, Odontología, Derecho...)\n"
+    "O dime qué asignatura necesitas."
+)
 
-    # Respuestas predefinidas basadas en palabras clave
-    elif any(word in user_message for word in ["precio", "costo", "cuánto", "vale"]):
-        response = "Los precios son fijados por los vendedores. Puedes contactarlos directamente a través de WhatsApp para negociar."
-
-    elif any(word in user_message for word in ["envio", "entrega", "envío", "llegar"]):
-        response = "Las entregas se coordinan directamente entre comprador y vendedor. Te recomendamos acordar el método de entrega al contactar al vendedor."
-
-    elif any(word in user_message for word in ["cuenta", "registro", "registrar", "crear"]):
-        response = "Para registrarte en UniShop, necesitas un correo institucional (@campusucc.edu.co). El registro incluye verificación de teléfono para publicar productos."
-
-    elif any(word in user_message for word in ["contactar", "whatsapp", "contacto"]):
-        response = "Puedes contactar a los vendedores directamente desde la página del producto usando el botón 'Contactar'. Se generará un mensaje automático en WhatsApp."
-
-    elif any(word in user_message for word in ["favorito", "favoritos", "guardar"]):
-        response = "Puedes guardar productos en tu lista de favoritos haciendo clic en el ícono de corazón. Los encontrarás en tu panel de usuario."
-
-    elif any(word in user_message for word in ["publicar", "vender", "venta"]):
-        response = "Para publicar un producto, ve a 'Vender' en el menú principal. Necesitas tener tu teléfono verificado y proporcionar al menos una foto del producto."
-
-    elif any(word in user_message for word in ["buscar", "encontrar", "filtros"]):
-        response = "Usa la barra de búsqueda en la página principal. Puedes filtrar por categoría, precio, condición y fecha de publicación."
-
-    elif any(word in user_message for word in ["seguridad", "seguro", "confianza"]):
-        response = "UniShop es exclusivo para la comunidad UCC. Todas las transacciones se realizan directamente entre estudiantes verificados."
-
-    elif any(word in user_message for word in ["laboratorio", "equipo", "equipos", "instrumental", "instrumentales", "material", "materiales", "útil", "útiles"]) and any(word in user_message for word in ["práctica", "prácticas", "experimento", "experimentos", "clase", "clases", "laboratorio"]):
-        # Recomendaciones de equipos por carrera
-        query_lower = user_message.lower()
-
-        if any(word in query_lower for word in ["enfermería", "enfermera", "cuidados"]):
-            response = "Para estudiantes de enfermería, recomiendo buscar:\n"
-            response += "• Estetoscopios Littmann\n"
-            response += "• Esfigmomanómetros digitales\n"
-            response += "• Termómetros profesionales\n"
-            response += "• Kits de venopunción\n"
-            response += "• Maniquíes de práctica\n\n"
-            response += "Estos equipos son ideales para tus prácticas en el centro de simulación médica de la UCC."
-
-        elif any(word in query_lower for word in ["medicina", "médico", "clínica"]):
-            response = "Para estudiantes de medicina, considera:\n"
-            response += "• Estetoscopios de calidad\n"
-            response += "• Otoscopios y oftalmoscopios\n"
-            response += "• Kits de diagnóstico\n"
-            response += "• Maniquíes anatómicos\n"
-            response += "• Microscopios\n\n"
-            response += "Material esencial para tus prácticas clínicas."
-
-        elif any(word in query_lower for word in ["odontología", "odontólogo", "dental"]):
-            response = "Para estudiantes de odontología, busca:\n"
-            response += "• Turbinas y micromotores\n"
-            response += "• Radiográficos portátiles\n"
-            response += "• Esterilizadores\n"
-            response += "• Instrumental quirúrgico\n"
-            response += "• Modelos anatómicos\n\n"
-            response += "Equipos indispensables para la clínica odontológica de la UCC."
-
-        elif any(word in query_lower for word in ["ingeniería", "software", "computación"]):
-            response = "Para ingeniería de software, considera:\n"
-            response += "• Laptops de desarrollo\n"
-            response += "• Raspberry Pi para IoT\n"
-            response += "• Arduino para prototipos\n"
-            response += "• Licencias de software IDE\n"
-            response += "• Tablets gráficas para UX/UI\n\n"
-            response += "Equipos perfectos para los laboratorios de desarrollo de la UCC."
-
-        elif any(word in query_lower for word in ["derecho", "jurídico", "abogado"]):
-            response = "Para estudiantes de derecho, busca:\n"
-            response += "• Código Civil y Penal colombiano\n"
-            response += "• Gacetas judiciales\n"
-            response += "• Software jurídico\n"
-            response += "• Bases de datos legales\n"
-            response += "• Equipos de audio para grabaciones\n\n"
-            response += "Material esencial para el consultorio jurídico de la UCC."
+SHORT_GREETING_RESPONSE = (
+    "¡Hola! 👋 **Soy UniBot**, el asistente inteligente de UniShop para estudiantes de la UCC.\n\n"
+    "Puedo ayudarte con:\n"
+    "• 🔍 **Buscar libros** y material académico por carrera\n"
+    "• 🛠️ **Encontrar equipos** de laboratorio y útiles\n"
+    "• 💼 **Preparación profesional** y empleabilidad\n"
+    "• 📱 **Navegar** y usar la plataforma UniShop\n\n"
+    "*¿En qué te puedo ayudar hoy?*"
+)
 
-        else:
-            response = "Para equipos de laboratorio, especifica tu carrera. La UCC tiene diferentes especialidades:\n"
-            response += "• Enfermería: Estetoscopios, tensiómetros\n"
-            response += "• Medicina: Equipos de diagnóstico\n"
-            response += "• Odontología: Instrumental dental\n"
-            response += "• Ingeniería: Equipos de desarrollo\n"
-            response += "• Derecho: Material jurídico\n\n"
-            response += "¿Qué carrera estudias?"
-
-    elif any(word in user_message for word in ["pasantía", "práctica", "empleo", "trabajo", "profesional"]):
-        # Recomendaciones para empleabilidad
-        response = "Para prepararte profesionalmente en la UCC:\n\n"
-        response += "📚 **Material de estudio:**\n"
-        response += "• Libros de tu especialidad\n"
-        response += "• Material de investigación\n"
-        response += "• Certificaciones profesionales\n\n"
-        response += "💼 **Preparación laboral:**\n"
-        response += "• Busca equipos reacondicionados\n"
-        response += "• Material de segunda mano confiable\n"
-        response += "• Útiles especializados por carrera\n\n"
-        response += "🎯 **Oportunidades UCC:**\n"
-        response += "• Consultorio jurídico (Derecho)\n"
-        response += "• Clínica odontológica (Odontología)\n"
-        response += "• Centro de simulación médica (Medicina/Enfermería)\n"
-        response += "• Laboratorios de desarrollo (Ingeniería)\n\n"
-        response += "¿En qué área te quieres especializar?"
-
-    elif any(word in user_message for word in ["tesis", "investigación", "proyecto", "grado", "monografía"]):
-        # Recomendaciones para investigación
-        response = "Para tu tesis o proyecto de investigación en la UCC:\n\n"
-        response += "📖 **Material académico:**\n"
-        response += "• Libros especializados en tu área\n"
-        response += "• Revistas científicas\n"
-        response += "• Material de investigación\n\n"
-        response += "🛠️ **Equipos especializados:**\n"
-        response += "• Equipos de laboratorio\n"
-        response += "• Software de análisis\n"
-        response += "• Herramientas de investigación\n\n"
-        response += "💡 **Recursos UCC:**\n"
-        response += "• Centro de investigación\n"
-        response += "• Biblioteca especializada\n"
-        response += "• Laboratorios equipados\n\n"
-        response += "¿Qué tema investigas o qué carrera estudias?"
-
-    elif any(word in user_message for word in ["caro", "costoso", "caro", "más caro", "más costoso", "más caro", "más costoso"]):
-        # Encontrar el producto más caro
-        all_products = await get_products_from_backend()
-        if all_products:
-            most_expensive = max(all_products, key=lambda x: x.get("price", 0))
-            response = f"El producto más caro disponible es '{most_expensive.get('name', 'N/A')}' con un precio de ${most_expensive.get('price', 0):,.0f}. Categoría: {most_expensive.get('categoryName', 'N/A')}."
-        else:
-            response = "Lo siento, no pude obtener información de los productos en este momento."
-
-    elif any(word in user_message for word in ["barato", "barata", "económico", "económica", "más barato", "más barata", "más económico", "más económica"]):
-        # Encontrar el producto más barato
-        all_products = await get_products_from_backend()
-        if all_products:
-            # Filtrar productos con precio > 0 para evitar productos gratuitos
-            valid_products = [p for p in all_products if p.get("price", 0) > 0]
-            if valid_products:
-                cheapest = min(valid_products, key=lambda x: x.get("price", 0))
-                response = f"El producto más económico disponible es '{cheapest.get('name', 'N/A')}' con un precio de ${cheapest.get('price', 0):,.0f}. Categoría: {cheapest.get('categoryName', 'N/A')}."
-            else:
-                response = "No encontré productos con precios válidos en este momento."
-        else:
-            response = "Lo siento, no pude obtener información de los productos en este momento."
+GREETING_RESPONSE = (
+    "¡Hola! 👋 ¿En qué puedo ayudarte?\n\n"
+    "Como asistente especializado en la comunidad UCC, te ayudo con:\n"
+    "• Material académico por carrera\n"
+    "• Equipos para prácticas\n"
+    "• Consejos para estudiantes\n"
+    "• Navegación en UniShop"
+)
 
-    elif any(word in user_message for word in ["libro", "libros", "texto", "manual", "aprender", "estudiar", "curso"]):
-        # Búsqueda contextual inteligente de libros usando clasificación semántica
-        all_products = await get_products_from_backend()
-        if all_products:
-            books = [p for p in all_products if p.get("categoryName", "").lower() == "libros"]
+PRICE_RESPONSE = "Los precios son fijados por los vendedores. Puedes contactarlos directamente a través de WhatsApp para negociar."
+SHIPPING_RESPONSE = "Las entregas se coordinan directamente entre comprador y vendedor. Te recomendamos acordar el método de entrega al contactar al vendedor."
+ACCOUNT_RESPONSE = "Para registrarte en UniShop, necesitas un correo institucional (@campusucc.edu.co). El registro incluye verificación de teléfono para publicar productos."
+CONTACT_RESPONSE = "Puedes contactar a los vendedores directamente desde la página del producto usando el botón 'Contactar'. Se generará un mensaje automático en WhatsApp."
+FAVORITES_RESPONSE = "Puedes guardar productos en tu lista de favoritos haciendo clic en el ícono de corazón. Los encontrarás en tu panel de usuario."
+SELL_RESPONSE = "Para publicar un producto, ve a 'Vender' en el menú principal. Necesitas tener tu teléfono verificado y proporcionar al menos una foto del producto."
+SEARCH_RESPONSE = "Usa la barra de búsqueda en la página principal. Puedes filtrar por categoría, precio, condición y fecha de publicación."
+SECURITY_RESPONSE = "UniShop es exclusivo para la comunidad UCC. Todas las transacciones se realizan directamente entre estudiantes verificados."
+
+# Recomendaciones de equipos de laboratorio por carrera
+LAB_EQUIPMENT_RESPONSES = {
+    "enfermeria": (
+        "Para estudiantes de enfermería, recomiendo buscar:\n"
+        "• Estetoscopios Littmann\n"
+        "• Esfigmomanómetros digitales\n"
+        "• Termómetros profesionales\n"
+        "• Kits de venopunción\n"
+        "• Maniquíes de práctica\n\n"
+        "Estos equipos son ideales para tus prácticas en el centro de simulación médica de la UCC."
+    ),
+    "medicina": (
+        "Para estudiantes de medicina, considera:\n"
+        "• Estetoscopios de calidad\n"
+        "• Otoscopios y oftalmoscopios\n"
+        "• Kits de diagnóstico\n"
+        "• Maniquíes anatómicos\n"
+        "• Microscopios\n\n"
+        "Material esencial para tus prácticas clínicas."
+    ),
+    "odontologia": (
+        "Para estudiantes de odontología, busca:\n"
+        "• Turbinas y micromotores\n"
+        "• Radiográficos portátiles\n"
+        "• Esterilizadores\n"
+        "• Instrumental quirúrgico\n"
+        "• Modelos anatómicos\n\n"
+        "Equipos indispensables para la clínica odontológica de la UCC."
+    ),
+    "ingenieria": (
+        "Para ingeniería de software, considera:\n"
+        "• Laptops de desarrollo\n"
+        "• Raspberry Pi para IoT\n"
+        "• Arduino para prototipos\n"
+        "• Licencias de software IDE\n"
+        "• Tablets gráficas para UX/UI\n\n"
+        "Equipos perfectos para los laboratorios de desarrollo de la UCC."
+    ),
+    "derecho": (
+        "Para estudiantes de derecho, busca:\n"
+        "• Código Civil y Penal colombiano\n"
+        "• Gacetas judiciales\n"
+        "• Software jurídico\n"
+        "• Bases de datos legales\n"
+        "• Equipos de audio para grabaciones\n\n"
+        "Material esencial para el consultorio jurídico de la UCC."
+    ),
+}
+
+LAB_EQUIPMENT_DEFAULT_RESPONSE = (
+    "Para equipos de laboratorio, especifica tu carrera. La UCC tiene diferentes especialidades:\n"
+    "• Enfermería: Estetoscopios, tensiómetros\n"
+    "• Medicina: Equipos de diagnóstico\n"
+    "• Odontología: Instrumental dental\n"
+    "• Ingeniería: Equipos de desarrollo\n"
+    "• Derecho: Material jurídico\n\n"
+    "¿Qué carrera estudias?"
+)
 
-            if not books:
-                response = "No encontré libros disponibles en este momento."
-            else:
-                # Usar clasificación semántica avanzada con contexto UCC
-                category, confidence = semantic_classifier.classify_academic_query(user_message)
-                scenario = semantic_classifier.detect_student_scenario(user_message)
+EMPLOYABILITY_RESPONSE = (
+    "Para prepararte profesionalmente en la UCC:\n\n"
+    "📚 **Material de estudio:**\n"
+    "• Libros de tu especialidad\n"
+    "• Material de investigación\n"
+    "• Certificaciones profesionales\n\n"
+    "💼 **Preparación laboral:**\n"
+    "• Busca equipos reacondicionados\n"
+    "• Material de segunda mano confiable\n"
+    "• Útiles especializados por carrera\n\n"
+    "🎯 **Oportunidades UCC:**\n"
+    "• Consultorio jurídico (Derecho)\n"
+    "• Clínica odontológica (Odontología)\n"
+    "• Centro de simulación médica (Medicina/Enfermería)\n"
+    "• Laboratorios de desarrollo (Ingeniería)\n\n"
+    "¿En qué área te quieres especializar?"
+)
 
-                if category and confidence > 0.2:
-                    # Búsqueda semántica por categoría detectada
-                    relevant_books = semantic_classifier.find_books_by_semantic_category(books, category)
+RESEARCH_RESPONSE = (
+    "Para tu tesis o proyecto de investigación en la UCC:\n\n"
+    "📖 **Material académico:**\n"
+    "• Libros especializados en tu área\n"
+    "• Revistas científicas\n"
+    "• Material de investigación\n\n"
+    "🛠️ **Equipos especializados:**\n"
+    "• Equipos de laboratorio\n"
+    "• Software de análisis\n"
+    "• Herramientas de investigación\n\n"
+    "💡 **Recursos UCC:**\n"
+    "• Centro de investigación\n"
+    "• Biblioteca especializada\n"
+    "• Laboratorios equipados\n\n"
+    "¿Qué tema investigas o qué carrera estudias?"
+)
 
+CATALOG_UNAVAILABLE_RESPONSE = "Lo siento, no pude obtener información de los productos en este momento."
+
+BOOK_SEARCH_HINT_RESPONSE = (
+    "Como estudiante de la UCC, puedes especificar mejor qué buscas. Por ejemplo:\n"
+    "• 'libros de medicina' (para estudiantes de medicina)\n"
+    "• 'libros de enfermería' (para estudiantes de enfermería)\n"
+    "• 'libros de derecho' (para estudiantes de derecho)\n"
+    "• 'material de laboratorio' (para prácticas)\n"
+    "• 'equipos odontológicos' (para estudiantes de odontología)\n\n"
+    "¿Qué carrera estudias o qué tipo de material necesitas?"
+)
+
+DEFAULT_RESPONSE = (
+    "Lo siento, no entendí completamente tu consulta. 🤔\n\n**Soy UniBot**, tu asistente especializado en UniShop para estudiantes de la UCC. Puedo ayudarte con:\n\n"
+    "• 📚 **Libros y material académico** por carrera\n"
+    "• 🔧 **Equipos de laboratorio** y útiles profesionales\n"
+    "• 💰 **Precios, envíos** y procesos de compra\n"
+    "• 👤 **Registro, perfiles** y uso de la plataforma\n"
+    "• 🎓 **Consejos específicos** para estudiantes UCC\n\n"
+    "*¿Podrías reformular tu pregunta o decirme qué necesitas?*"
+)
+
+ChatHandler = Callable[[str, Set[str]], Awaitable[str]]
+
+def _static_response(response: str) -> ChatHandler:
+    """Crea un manejador que siempre devuelve la misma respuesta predefinida"""
+    async def handler(user_message: str, matched_groups: Set[str]) -> str:
+        return response
+    return handler
+
+async def _greeting_response(user_message: str, matched_groups: Set[str]) -> str:
+    """Respuestas más contextuales y conversacionales a los saludos"""
+    if "compra" in matched_groups:
+        response = BUY_RESPONSE
+
+    elif "material_estudio" in matched_groups:
+        response = STUDY_MATERIAL_GREETING_RESPONSE
+
+    elif len(user_message.split()) <= 3:  # Saludos simples
+        response = SHORT_GREETING_RESPONSE
+
+    else:  # Saludos con más contexto
+        response = GREETING_RESPONSE
+
+    return response
+
+async def _lab_equipment_response(user_message: str, matched_groups: Set[str]) -> str:
+    """Recomendaciones de equipos de laboratorio por carrera"""
+    career = first_matching_group(CAREER_PATTERN, CAREER_KEYWORDS, user_message)
+    return LAB_EQUIPMENT_RESPONSES.get(career, LAB_EQUIPMENT_DEFAULT_RESPONSE)
+
+async def _most_expensive_response(user_message: str, matched_groups: Set[str]) -> str:
+    """Encuentra el producto más caro"""
+    all_products = await get_products_from_backend()
+    if all_products:
+        # Precalculado al refrescar la caché del catálogo
+        most_expensive = _catalog_cache["most_expensive"]
+        response = f"El producto más caro disponible es '{most_expensive.get('name', 'N/A')}' con un precio de ${most_expensive.get('price', 0):,.0f}. Categoría: {most_expensive.get('categoryName', 'N/A')}."
+    else:
+        response = CATALOG_UNAVAILABLE_RESPONSE
+
+    return response
+
+async def _cheapest_response(user_message: str, matched_groups: Set[str]) -> str:
+    """Encuentra el producto más barato"""
+    all_products = await get_products_from_backend()
+    if all_products:
+        # Precalculado al refrescar la caché del catálogo
+        cheapest = _catalog_cache["cheapest"]
+        if cheapest:
+            response = f"El producto más económico disponible es '{cheapest.get('name', 'N/A')}' con un precio de ${cheapest.get('price', 0):,.0f}. Categoría: {cheapest.get('categoryName', 'N/A')}."
+        else:
+            response = "No encontré productos con precios válidos en este momento."
+    else:
+        response = CATALOG_UNAVAILABLE_RESPONSE
+
+    return response
+
+async def _books_response(user_message: str, matched_groups: Set[str]) -> str:
+    """Búsqueda contextual inteligente de libros usando clasificación semántica"""
+    all_products = await get_products_from_backend()
+    if all_products:
+        # Libros filtrados una sola vez al refrescar la caché del catálogo
+        books = _catalog_cache["books"]
+        classifier = get_semantic_classifier()
+
+        if not books:
+            response = "No encontré libros disponibles en este momento."
+        else:
+            # Usar clasificación semántica avanzada con contexto UCC
+            # (las llamadas al modelo se ejecutan en un hilo para no bloquear el event loop)
+            category, confidence = await asyncio.to_thread(
+                classifier.classify_academic_query, user_message
+            )
+            scenario = classifier.detect_student_scenario(user_message)
+
+            if category and confidence > 0.2:
+                # Búsqueda semántica por categoría detectada
+                relevant_books = await asyncio.to_thread(
+                    classifier.find_books_by_semantic_category, books, category
+                )
+
+                if relevant_books:
+                    category_display = CATEGORY_DISPLAY_NAMES.get(category, category)
+
+                    # Respuesta contextual basada en escenario
+                    if scenario == "pregrado_inicio":
+                        intro_text = f"¡Perfecto para empezar tu carrera en {category_display}! "
+                    elif scenario == "práctica_laboratorio":
+                        intro_text = f"Excelente para tus prácticas de {category_display}. "
+                    elif scenario == "investigación":
+                        intro_text = f"Ideal para investigación en {category_display}. "
+                    elif scenario == "profesionalización":
+                        intro_text = f"Material profesional de {category_display}. "
+                    else:
+                        intro_text = f"Material académico de {category_display}. "
+
+                    # Las líneas se acumulan y se unen una sola vez al final
+                    parts: List[str] = [f"{intro_text}Encontré estos libros:", ""]
+
+                    for i, book in enumerate(relevant_books[:3], 1):
+                        product_id = book.get('id', '')
+                        product_name = book.get('name', 'N/A')
+                        product_price = book.get('price', 0)
+                        # Crear enlace al producto usando el formato del frontend
+                        product_link = f"[{product_name}](/product/{product_id})"
+                        parts.append(f"{i}. {product_link} - **${product_price:,.0f}**")
+
+                    # Recomendaciones contextuales adicionales
+                    contextual_info = classifier.get_contextual_recommendations(category, scenario)
+                    if contextual_info.get("tips"):
+                        parts.append("")
+                        parts.append(f"💡 **Tips para estudiantes de {category_display}:**")
+                        for tip in contextual_info["tips"][:2]:  # Máximo 2 tips
+                            parts.append(f"• {tip}")
+
+                    parts.append("")
+                    parts.append("📖 **Recomendación:** Haz clic en el nombre de cualquier libro para ver más detalles y contactar al vendedor.")
+                    response = "\n".join(parts)
+                else:
+                    response = f"No encontré libros específicos de {CATEGORY_DISPLAY_NAMES.get(category, category)}, pero puedes explorar la categoría 'Libros' para más opciones."
+            else:
+                # Fallback: búsqueda por palabras clave específicas con contexto UCC
+                topic = first_matching_group(BOOK_TOPIC_PATTERN, BOOK_TOPIC_KEYWORDS, user_message)
+
+                # Búsqueda específica para casos comunes en UCC
+                if topic == "musculoesqueletico":
+                    relevant_books = await asyncio.to_thread(
+                        classifier.find_books_by_semantic_category, books, "medicina"
+                    )
                     if relevant_books:
-                        # Nombres de categorías más amigables para estudiantes UCC
-                        category_names = {
-                            "medicina": "medicina",
-                            "enfermeria": "enfermería",
-                            "odontologia": "odontología",
-                            "ingenieria_software": "ingeniería de software",
-                            "derecho": "derecho",
-                            "matematicas": "matemáticas",
-                            "administracion": "administración"
-                        }
-
-                        category_display = category_names.get(category, category)
-
-                        # Respuesta contextual basada en escenario
-                        if scenario == "pregrado_inicio":
-                            intro_text = f"¡Perfecto para empezar tu carrera en {category_display}! "
-                        elif scenario == "práctica_laboratorio":
-                            intro_text = f"Excelente para tus prácticas de {category_display}. "
-                        elif scenario == "investigación":
-                            intro_text = f"Ideal para investigación en {category_display}. "
-                        elif scenario == "profesionalización":
-                            intro_text = f"Material profesional de {category_display}. "
-                        else:
-                            intro_text = f"Material académico de {category_display}. "
-
-                        response = f"{intro_text}Encontré estos libros:\n\n"
+                        parts = ["Para estudiantes de medicina, enfermería u odontología interesados en sistema musculoesquelético:"]
+                        for i, book in enumerate(relevant_books[:3], 1):
+                            parts.append(f"{i}. '{book.get('name', 'N/A')}' - ${book.get('price', 0):,.0f}")
+                        parts.append("")
+                        parts.append("Estos libros son ideales para tus prácticas en el centro de simulación médica de la UCC.")
+                        response = "\n".join(parts)
+                    else:
+                        response = "No encontré libros específicos sobre sistema musculoesquelético."
 
+                elif topic == "programacion":
+                    relevant_books = await asyncio.to_thread(
+                        classifier.find_books_by_semantic_category, books, "ingenieria_software"
+                    )
+                    if relevant_books:
+                        parts = ["Para estudiantes de ingeniería de software:"]
                         for i, book in enumerate(relevant_books[:3], 1):
-                            product_id = book.get('id', '')
-                            product_name = book.get('name', 'N/A')
-                            product_price = book.get('price', 0)
-                            # Crear enlace al producto usando el formato del frontend
-                            product_link = f"[{product_name}](/product/{product_id})"
-                            response += f"{i}. {product_link} - **${product_price:,.0f}**\n"
-
-                        # Recomendaciones contextuales adicionales
-                        contextual_info = semantic_classifier.get_contextual_recommendations(category, scenario)
-                        if contextual_info.get("tips"):
-                            response += f"\n💡 **Tips para estudiantes de {category_display}:**\n"
-                            for tip in contextual_info["tips"][:2]:  # Máximo 2 tips
-                                response += f"• {tip}\n"
-
-                        response += f"\n📖 **Recomendación:** Haz clic en el nombre de cualquier libro para ver más detalles y contactar al vendedor."
+                            parts.append(f"{i}. '{book.get('name', 'N/A')}' - ${book.get('price', 0):,.0f}")
+                        parts.append("")
+                        parts.append("Recuerda que la UCC tiene laboratorios especializados para desarrollo de software.")
+                        response = "\n".join(parts)
                     else:
-                        response = f"No encontré libros específicos de {category_names.get(category, category)}, pero puedes explorar la categoría 'Libros' para más opciones."
+                        response = "No encontré libros específicos sobre Python o desarrollo de software."
                 else:
-                    # Fallback: búsqueda por palabras clave específicas con contexto UCC
-                    query_lower = user_message.lower()
-
-                    # Búsqueda específica para casos comunes en UCC
-                    if any(word in query_lower for word in ["músculo", "muscular", "esquelet", "esqueleto", "ortoped", "traumatolog", "kinesiolog"]):
-                        relevant_books = semantic_classifier.find_books_by_semantic_category(books, "medicina")
-                        if relevant_books:
-                            response = "Para estudiantes de medicina, enfermería u odontología interesados en sistema musculoesquelético:\n"
-                            for i, book in enumerate(relevant_books[:3], 1):
-                                response += f"{i}. '{book.get('name', 'N/A')}' - ${book.get('price', 0):,.0f}\n"
-                            response += "\nEstos libros son ideales para tus prácticas en el centro de simulación médica de la UCC."
-                        else:
-                            response = "No encontré libros específicos sobre sistema musculoesquelético."
-
-                    elif any(word in query_lower for word in ["python", "programacion", "desarrollo", "software", "algoritmo"]):
-                        relevant_books = semantic_classifier.find_books_by_semantic_category(books, "ingenieria_software")
-                        if relevant_books:
-                            response = "Para estudiantes de ingeniería de software:\n"
-                            for i, book in enumerate(relevant_books[:3], 1):
-                                response += f"{i}. '{book.get('name', 'N/A')}' - ${book.get('price', 0):,.0f}\n"
-                            response += "\nRecuerda que la UCC tiene laboratorios especializados para desarrollo de software."
-                        else:
-                            response = "No encontré libros específicos sobre Python o desarrollo de software."
-                    else:
-                        # Sugerencias contextuales para estudiantes UCC
-                        response = "Como estudiante de la UCC, puedes especificar mejor qué buscas. Por ejemplo:\n"
-                        response += "• 'libros de medicina' (para estudiantes de medicina)\n"
-                        response += "• 'libros de enfermería' (para estudiantes de enfermería)\n"
-                        response += "• 'libros de derecho' (para estudiantes de derecho)\n"
-                        response += "• 'material de laboratorio' (para prácticas)\n"
-                        response += "• 'equipos odontológicos' (para estudiantes de odontología)\n\n"
-                        response += "¿Qué carrera estudias o qué tipo de material necesitas?"
-        else:
-            response = "Lo siento, no pude acceder al catálogo de libros en este momento."
+                    # Sugerencias contextuales para estudiantes UCC
+                    response = BOOK_SEARCH_HINT_RESPONSE
+    else:
+        response = "Lo siento, no pude acceder al catálogo de libros en este momento."
+
+    return response
+
+# Reglas del chatbot en orden de prioridad: (grupos de palabras clave requeridos, manejador)
+CHAT_RULES: List[Tuple[FrozenSet[str], ChatHandler]] = [
+    # Respuestas conversacionales y contextuales para estudiantes UCC
+    (frozenset({"saludo"}), _greeting_response),
+    # Respuestas predefinidas basadas en palabras clave
+    (frozenset({"precio"}), _static_response(PRICE_RESPONSE)),
+    (frozenset({"envio"}), _static_response(SHIPPING_RESPONSE)),
+    (frozenset({"cuenta"}), _static_response(ACCOUNT_RESPONSE)),
+    (frozenset({"contacto"}), _static_response(CONTACT_RESPONSE)),
+    (frozenset({"favoritos"}), _static_response(FAVORITES_RESPONSE)),
+    (frozenset({"venta"}), _static_response(SELL_RESPONSE)),
+    (frozenset({"busqueda"}), _static_response(SEARCH_RESPONSE)),
+    (frozenset({"seguridad"}), _static_response(SECURITY_RESPONSE)),
+    (frozenset({"equipo_laboratorio", "actividad_laboratorio"}), _lab_equipment_response),
+    (frozenset({"empleabilidad"}), _static_response(EMPLOYABILITY_RESPONSE)),
+    (frozenset({"investigacion"}), _static_response(RESEARCH_RESPONSE)),
+    (frozenset({"mas_caro"}), _most_expensive_response),
+    (frozenset({"mas_barato"}), _cheapest_response),
+    (frozenset({"libros"}), _books_response),
+]
+
+# Índice grupo de palabras clave -> reglas que lo requieren, para evaluar solo las reglas candidatas
+CHAT_RULE_INDEX: Dict[str, List[int]] = defaultdict(list)
+for rule_index, (required_groups, _) in enumerate(CHAT_RULES):
+    for group in required_groups:
+        CHAT_RULE_INDEX[group].append(rule_index)
+
+class ChatbotMessage(BaseModel):
+    """Mensaje enviado por el usuario al chatbot"""
+    message: str = ""
 
+@app.post("/api/v1/chatbot/message")
+async def chatbot_message(body: ChatbotMessage) -> Dict[str, str]:
+    """
+    Procesa mensajes del chatbot con respuestas predefinidas basadas en reglas
+    """
+    # El mensaje se normaliza una sola vez; los manejadores lo reciben ya en minúsculas
+    user_message = body.message.lower().strip()
+    matched_groups = chat_keyword_matcher.match(user_message)
+
+    # Sin ninguna palabra clave conocida no hay regla que evaluar
+    if not matched_groups:
+        return {"response": DEFAULT_RESPONSE}
+
+    # Solo se evalúan las reglas que comparten algún grupo con el mensaje, en orden de prioridad;
+    # gana la primera cuyos grupos requeridos aparecen todos
+    candidates = sorted({index for group in matched_groups for index in CHAT_RULE_INDEX.get(group, ())})
+    handler = next(
+        (CHAT_RULES[index][1] for index in candidates if CHAT_RULES[index][0] <= matched_groups),
+        None,
+    )
+    if handler:
+        response = await handler(user_message, matched_groups)
     else:
-        response = "Lo siento, no entendí completamente tu consulta. 🤔\n\n**Soy UniBot**, tu asistente especializado en UniShop para estudiantes de la UCC. Puedo ayudarte con:\n\n"
-        response += "• 📚 **Libros y material académico** por carrera\n"
-        response += "• 🔧 **Equipos de laboratorio** y útiles profesionales\n"
-        response += "• 💰 **Precios, envíos** y procesos de compra\n"
-        response += "• 👤 **Registro, perfiles** y uso de la plataforma\n"
-        response += "• 🎓 **Consejos específicos** para estudiantes UCC\n\n"
-        response += "*¿Podrías reformular tu pregunta o decirme qué necesitas?*"
-
-    return {"response": response}
\ No newline at end of file
+        response = DEFAULT_RESPONSE
+
+    return {"response": response}
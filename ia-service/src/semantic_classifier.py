@@ -3,28 +3,125 @@ Módulo de clasificación semántica para el servicio de IA de UniShop.
 Utiliza embeddings para clasificar consultas y productos de manera inteligente.
 """
 
+import os
+import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Tuple, Optional
+import functools
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Optional, Set
 import numpy as np
 
 try:
     from sentence_transformers import SentenceTransformer
-    from sklearn.metrics.pairwise import cosine_similarity
     SEMANTIC_AVAILABLE = True
 except ImportError:
     SEMANTIC_AVAILABLE = False
     logging.warning("sentence-transformers no disponible. Usando solo sistema basado en reglas.")
 
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+    logging.info("simsimd no disponible. Similitud coseno calculada con NumPy.")
+
+try:
+    from .keyword_matcher import KeywordMatcher, compile_keyword_groups, first_matching_group
+except ImportError:
+    # Fallback for running in container
+    from keyword_matcher import KeywordMatcher, compile_keyword_groups, first_matching_group
+
 logger = logging.getLogger(__name__)
 
+# Modelo ligero optimizado para CPU
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Ejecutar el modelo con ONNX Runtime (requiere sentence-transformers>=3.2 y optimum[onnxruntime])
+USE_ONNX = os.getenv("SEMANTIC_USE_ONNX", "false").lower() == "true"
+
+# Guardar los embeddings de libros en int8 (4 veces menos memoria) en lugar de float32
+QUANTIZE_EMBEDDINGS = os.getenv("SEMANTIC_QUANTIZE_EMBEDDINGS", "false").lower() == "true"
+
+# Memoria máxima (MB) para la caché de embeddings de consultas
+QUERY_CACHE_MB = float(os.getenv("SEMANTIC_QUERY_CACHE_MB", "4"))
+
+# Máximo de libros (texto + embedding) que se mantienen en memoria
+BOOK_CACHE_SIZE = int(os.getenv("SEMANTIC_BOOK_CACHE_SIZE", "5000"))
+
+# Directorio donde se guardan los embeddings de categorías entre reinicios
+EMBEDDING_CACHE_DIR = os.path.expanduser(os.getenv("SEMANTIC_CACHE_DIR", "~/.cache/unishop"))
+# Subir al cambiar la forma en que se construyen los embeddings de categorías
+EMBEDDING_CACHE_VERSION = 2
+
+def _cos_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Similitud coseno entre cada fila de `a` y cada fila de `b` (ambas normalizadas L2).
+
+    Returns:
+        Matriz float32 de forma [filas de a, filas de b]
+    """
+    if SIMSIMD_AVAILABLE:
+        # Kernels SIMD (AVX2/AVX-512/NEON) sobre arreglos float32 contiguos
+        distances = simsimd.cdist(np.ascontiguousarray(a), np.ascontiguousarray(b), metric="cosine")
+        return (1.0 - np.asarray(distances)).astype(np.float32)
+
+    return a @ b.T
+
+def _quantize(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cuantiza cada fila a int8 con su propia escala (fila ≈ q * escala).
+
+    Returns:
+        Tupla de (matriz int8, escalas float32 por fila)
+    """
+    max_abs = np.abs(arr).max(axis=1)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    q = np.round(arr / scales[:, None]).astype(np.int8)
+    return q, scales
+
 class SemanticClassifier:
     """
     Clasificador semántico que combina embeddings con reglas para mejor precisión.
     """
 
-    def __init__(self):
-        self.model = None
-        self.category_embeddings = {}
+    # Reglas específicas para cada categoría (clasificación de respaldo sin modelo).
+    # Constantes de clase ya en minúsculas: no se reconstruyen en cada consulta.
+    _RULES: Dict[str, Tuple[str, ...]] = {
+        "medicina": ("medicina", "anatomía", "fisiología", "patología", "cardiología",
+                     "enfermería", "clínica", "hospital", "paciente", "diagnóstico"),
+        "ingenieria_software": ("programación", "python", "java", "javascript", "algoritmo",
+                                "software", "desarrollo", "código", "programar"),
+        "matematicas": ("cálculo", "álgebra", "geometría", "ecuaciones", "matemáticas"),
+        "derecho": ("derecho", "jurídico", "ley", "constitucional", "penal", "civil"),
+        "administracion": ("administración", "contabilidad", "finanzas", "marketing", "empresa")
+    }
+
+    def __init__(self, max_cache_mb: float = QUERY_CACHE_MB, use_onnx: bool = USE_ONNX,
+                 quantize_embeddings: bool = QUANTIZE_EMBEDDINGS):
+        # El modelo se carga de forma diferida en el primer acceso a `model`
+        self._model = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
+        self.use_onnx = use_onnx
+        # Embeddings de categorías normalizados (L2) y apilados en una matriz [categorías, dimensión]
+        self._cat_names: List[str] = []
+        self._cat_index: Dict[str, int] = {}
+        self._cat_matrix: Optional[np.ndarray] = None
+        # Versión int8 de la matriz de categorías (solo con quantize_embeddings)
+        self.quantize_embeddings = quantize_embeddings
+        self._cat_q: Optional[np.ndarray] = None
+        self._cat_scales: Optional[np.ndarray] = None
+        # Caché LRU de embeddings de consultas (consulta normalizada -> vector float32)
+        self.max_cache_mb = max_cache_mb
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_size = 0
+        self._query_cache_lock = threading.Lock()
+        # Caché LRU por libro (texto combinado, en minúsculas y embedding) para no recalcularlos
+        self._book_cache: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._book_cache_lock = threading.Lock()
+        self._book_cache_warned = False
         # Categorías académicas específicas de la UCC - Campus Pasto
         self.academic_categories = {
             "ingenieria_software": [
@@ -83,29 +180,186 @@ class SemanticClassifier:
             "especialización": ["especialización", "maestría", "posgrado", "doctorado"]
         }
 
-        if SEMANTIC_AVAILABLE:
+        # Palabras clave en minúsculas y congeladas en tuplas una sola vez
+        self._academic_categories_lc = self._lowercase_keywords(self.academic_categories)
+        self._student_scenarios_lc = self._lowercase_keywords(self.student_scenarios)
+
+        # Autómatas de palabras clave: una sola pasada por texto en lugar de un `in` por palabra
+        self._rule_matcher = KeywordMatcher(self._RULES)
+        self._book_keyword_matchers = {
+            category: KeywordMatcher({category: keywords})
+            for category, keywords in self._academic_categories_lc.items()
+        }
+        # Reglas y términos académicos juntos, como palabras completas, para el atajo de clasificación
+        self._shortcut_matcher = KeywordMatcher(
+            {
+                category: self._RULES.get(category, ()) + keywords
+                for category, keywords in self._academic_categories_lc.items()
+            },
+            whole_words=True
+        )
+
+        # Escenarios: una sola alternancia con un grupo con nombre por escenario
+        self._scenario_pattern = compile_keyword_groups(self._student_scenarios_lc)
+
+    @property
+    def model(self):
+        """Modelo de embeddings; se carga (junto con los embeddings de categorías) en el primer uso."""
+        if not self._model_loaded:
+            self._load_model()
+        return self._model
+
+    def _load_model(self):
+        """Carga el modelo una sola vez aunque varios hilos lo pidan a la vez."""
+        with self._model_lock:
+            if self._model_loaded:
+                return
+
+            if SEMANTIC_AVAILABLE:
+                try:
+                    self._model = self._create_model()
+                    self._initialize_category_embeddings()
+                    logger.info("Clasificador semántico inicializado correctamente")
+                except Exception as e:
+                    logger.error(f"Error inicializando modelo semántico: {e}")
+                    # Desactivar funcionalidad semántica si hay error
+                    self._model = None
+            else:
+                logger.info("Usando solo clasificación basada en reglas")
+
+            self._model_loaded = True
+
+    @staticmethod
+    def _lowercase_keywords(groups: Dict[str, List[str]]) -> Dict[str, Tuple[str, ...]]:
+        """Normaliza a minúsculas las palabras clave de cada grupo y las congela en tuplas."""
+        return {
+            group: tuple(keyword.lower() for keyword in keywords)
+            for group, keywords in groups.items()
+        }
+
+    def _create_model(self):
+        """
+        Crea el modelo de embeddings. Con use_onnx se usa ONNX Runtime en CPU
+        (operaciones fusionadas y sin autograd); si no está disponible se vuelve a PyTorch.
+        """
+        if self.use_onnx:
             try:
-                # Modelo ligero optimizado para CPU
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                self._initialize_category_embeddings()
-                logger.info("Clasificador semántico inicializado correctamente")
+                return SentenceTransformer(
+                    MODEL_NAME,
+                    backend="onnx",
+                    model_kwargs={"provider": "CPUExecutionProvider"}
+                )
             except Exception as e:
-                logger.error(f"Error inicializando modelo semántico: {e}")
-                # Desactivar funcionalidad semántica si hay error
-                self.model = None
-        else:
-            logger.info("Usando solo clasificación basada en reglas")
+                logger.warning(f"Backend ONNX no disponible, usando PyTorch: {e}")
+                self.use_onnx = False
+
+        return SentenceTransformer(MODEL_NAME)
 
     def _initialize_category_embeddings(self):
         """Inicializa los embeddings de referencia para cada categoría académica."""
-        if not self.model:
+        if not self._model:
             return
 
-        for category, keywords in self.academic_categories.items():
-            # Crear un texto representativo de la categoría
-            category_text = f"{category} {' '.join(keywords)}"
-            self.category_embeddings[category] = self.model.encode(category_text)
-            logger.debug(f"Embedding creado para categoría: {category}")
+        cache_path = self._category_cache_path()
+        if not self._load_category_embeddings(cache_path):
+            # Textos por categoría divididos para no exceder la ventana del modelo;
+            # todos los fragmentos de todas las categorías se codifican en una sola llamada
+            self._cat_names = list(self.academic_categories)
+            chunk_texts: List[str] = []
+            chunk_owners: List[int] = []
+            for i, (category, keywords) in enumerate(self.academic_categories.items()):
+                for chunk in self._category_chunks(category, keywords):
+                    chunk_texts.append(chunk)
+                    chunk_owners.append(i)
+
+            embeddings = self._model.encode(
+                chunk_texts,
+                convert_to_numpy=True,
+                normalize_embeddings=False,
+                show_progress_bar=False
+            )
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            owners = np.asarray(chunk_owners)
+
+            # Promedio de los fragmentos de cada categoría y normalización L2 del promedio
+            matrix = np.vstack([embeddings[owners == i].mean(axis=0) for i in range(len(self._cat_names))])
+            self._cat_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._save_category_embeddings(cache_path)
+
+        self._cat_index = {category: i for i, category in enumerate(self._cat_names)}
+        if self.quantize_embeddings:
+            self._cat_q, self._cat_scales = _quantize(self._cat_matrix)
+
+        # Número de entradas de la caché de consultas que caben en max_cache_mb
+        self._query_cache_size = int(self.max_cache_mb * 1024 * 1024) // self._cat_matrix[0].nbytes
+
+        for category in self._cat_names:
+            logger.debug("Embedding creado para categoría: %s", category)
+
+    def _category_chunks(self, category: str, keywords: List[str]) -> List[str]:
+        """
+        Divide las palabras clave (sin repetidas) de una categoría en textos que caben
+        en max_seq_length del modelo, cada uno encabezado por el nombre de la categoría.
+        """
+        tokenize = self._model.tokenizer.tokenize
+        budget = self._model.max_seq_length - 2  # [CLS] y [SEP]
+        header_tokens = len(tokenize(category))
+
+        chunks: List[str] = []
+        current, used = [category], header_tokens
+        for keyword in dict.fromkeys(keywords):
+            cost = len(tokenize(keyword))
+            if len(current) > 1 and used + cost > budget:
+                chunks.append(" ".join(current))
+                current, used = [category], header_tokens
+            current.append(keyword)
+            used += cost
+        chunks.append(" ".join(current))
+
+        return chunks
+
+    def _category_cache_path(self) -> str:
+        """Ruta del archivo .npz, ligada al modelo, su backend y el contenido de las categorías."""
+        payload = json.dumps(
+            [EMBEDDING_CACHE_VERSION, self.academic_categories],
+            sort_keys=True, ensure_ascii=False
+        )
+        key = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+        model_name = MODEL_NAME.replace("/", "_")
+        backend = "onnx" if self.use_onnx else "torch"
+        return os.path.join(EMBEDDING_CACHE_DIR, f"cat_emb_{model_name}_{backend}_{key}.npz")
+
+    def _load_category_embeddings(self, path: str) -> bool:
+        """Carga los embeddings de categorías desde disco. Devuelve False si no hay caché válida."""
+        try:
+            with np.load(path) as data:
+                names = [str(name) for name in data["names"]]
+                matrix = np.asarray(data["matrix"], dtype=np.float32)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Caché de embeddings de categorías inválida ({path}): {e}")
+            return False
+
+        if set(names) != set(self.academic_categories) or matrix.shape[0] != len(names):
+            return False
+
+        self._cat_names = names
+        self._cat_matrix = matrix
+        logger.info(f"Embeddings de categorías cargados desde {path}")
+        return True
+
+    def _save_category_embeddings(self, path: str):
+        """Guarda los embeddings de categorías en disco; si falla solo se registra."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escribir en un temporal y renombrar para que otro worker nunca lea un archivo a medias
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, names=np.array(self._cat_names), matrix=self._cat_matrix)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la caché de embeddings de categorías: {e}")
 
     def classify_academic_query(self, query: str, threshold: float = 0.3) -> Tuple[Optional[str], float]:
         """
@@ -118,34 +372,78 @@ class SemanticClassifier:
         Returns:
             Tupla de (categoría, confianza) o (None, 0) si no clasifica
         """
-        if not SEMANTIC_AVAILABLE or not self.model:
+        # Sin modelo (paquete ausente o carga fallida) solo se usan las reglas
+        if not SEMANTIC_AVAILABLE or (self._model_loaded and self._model is None):
             return self._rule_based_classification(query)
 
-        try:
-            query_embedding = self.model.encode(query)
+        # Atajo: si las palabras clave señalan una única categoría no hace falta el modelo
+        # (se evalúa antes de acceder a `model` para no cargarlo si todas las consultas lo resuelven)
+        keyword_category = self._keyword_category(query)
+        if keyword_category is not None:
+            return keyword_category, 0.8
 
-            best_category = None
-            best_similarity = 0.0
+        if not self.model:
+            return self._rule_based_classification(query)
 
-            for category, category_embedding in self.category_embeddings.items():
-                similarity = cosine_similarity(
-                    [query_embedding],
-                    [category_embedding]
-                )[0][0]
+        try:
+            query_embedding = self._encode_query(query)
 
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_category = category
+            # Con vectores normalizados la similitud coseno es un producto punto:
+            # una sola multiplicación matriz-vector puntúa todas las categorías
+            similarities = self._cat_matrix @ query_embedding
+            best_index = int(similarities.argmax())
+            best_similarity = float(similarities[best_index])
 
             if best_similarity >= threshold:
-                return best_category, best_similarity
+                return self._cat_names[best_index], best_similarity
             else:
-                return None, best_similarity
+                return None, max(best_similarity, 0.0)
 
         except Exception as e:
             logger.error(f"Error en clasificación semántica: {e}")
             return self._rule_based_classification(query)
 
+    def _keyword_category(self, query: str) -> Optional[str]:
+        """
+        Devuelve la categoría si la consulta contiene palabras clave de una sola categoría.
+        Sin coincidencias, o con coincidencias de varias categorías, devuelve None.
+        """
+        matched_categories = self._shortcut_matcher.match(query.lower())
+        if len(matched_categories) == 1:
+            return next(iter(matched_categories))
+        return None
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Obtiene el embedding normalizado de una consulta, reutilizando la caché LRU.
+        Las consultas que solo difieren en mayúsculas o espacios comparten entrada
+        (el modelo no distingue mayúsculas).
+        """
+        normalized_query = " ".join(query.lower().split())
+
+        with self._query_cache_lock:
+            cached = self._query_cache.get(normalized_query)
+            if cached is not None:
+                self._query_cache.move_to_end(normalized_query)
+                return cached
+
+        embedding = self.model.encode(
+            normalized_query,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        embedding = np.asarray(embedding, dtype=np.float32)
+
+        if self._query_cache_size > 0:
+            with self._query_cache_lock:
+                self._query_cache[normalized_query] = embedding
+                self._query_cache.move_to_end(normalized_query)
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+        return embedding
+
     def detect_student_scenario(self, query: str) -> Optional[str]:
         """
         Detecta el escenario académico del estudiante (inicio carrera, práctica, investigación, etc.)
@@ -156,13 +454,8 @@ class SemanticClassifier:
         Returns:
             Escenario detectado o None
         """
-        query_lower = query.lower()
-
-        for scenario, keywords in self.student_scenarios.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return scenario
-
-        return None
+        # Un solo recorrido de la consulta; gana el primer escenario en orden de prioridad
+        return first_matching_group(self._scenario_pattern, self._student_scenarios_lc, query.lower())
 
     def get_contextual_recommendations(self, category: str, scenario: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -250,20 +543,10 @@ class SemanticClassifier:
     def _rule_based_classification(self, query: str) -> Tuple[Optional[str], float]:
         """Clasificación basada en reglas como fallback."""
         query_lower = query.lower()
+        matched_categories = self._rule_matcher.match(query_lower)
 
-        # Reglas específicas para cada categoría
-        rules = {
-            "medicina": ["medicina", "anatomía", "fisiología", "patología", "cardiología",
-                        "enfermería", "clínica", "hospital", "paciente", "diagnóstico"],
-            "ingenieria_software": ["programación", "python", "java", "javascript", "algoritmo",
-                                  "software", "desarrollo", "código", "programar"],
-            "matematicas": ["cálculo", "álgebra", "geometría", "ecuaciones", "matemáticas"],
-            "derecho": ["derecho", "jurídico", "ley", "constitucional", "penal", "civil"],
-            "administracion": ["administración", "contabilidad", "finanzas", "marketing", "empresa"]
-        }
-
-        for category, keywords in rules.items():
-            if any(keyword in query_lower for keyword in keywords):
+        for category in self._RULES:
+            if category in matched_categories:
                 return category, 0.8  # Confianza alta para coincidencias exactas
 
         return None, 0.0
@@ -285,61 +568,177 @@ class SemanticClassifier:
         if not SEMANTIC_AVAILABLE or not self.model:
             return self._rule_based_book_filter(books, target_category)
 
-        if target_category not in self.category_embeddings:
+        if target_category not in self._cat_index:
             logger.warning(f"Categoría no encontrada: {target_category}")
             return []
 
         try:
-            matching_books = []
-
-            for book in books:
-                # Combinar título y descripción para mejor contexto
-                book_text = f"{book.get('name', '')} {book.get('description', '')}"
-
-                if not book_text.strip():
-                    continue
-
-                book_embedding = self.model.encode(book_text)
-                category_embedding = self.category_embeddings[target_category]
+            # Combinar título y descripción para mejor contexto; los libros sin texto se omiten
+            payloads = [self._get_book_payload(book) for book in books]
+            self._trim_book_cache({self._book_key(book) for book in books})
+            valid_indices = [i for i, payload in enumerate(payloads) if payload["text"].strip()]
+
+            if not valid_indices:
+                return []
+
+            book_embeddings, book_scales = self._encode_books([payloads[i] for i in valid_indices])
+            category_index = self._cat_index[target_category]
+
+            if self.quantize_embeddings:
+                # Producto punto entero int8 (acumulado en int32) y descuantización con las escalas
+                category_q = self._cat_q[category_index].astype(np.int32)
+                # El resultado entero pasa a float32 antes de escalar (int32 * float32 daría float64)
+                similarities = (book_embeddings.astype(np.int32) @ category_q).astype(np.float32) * (
+                    book_scales * self._cat_scales[category_index]
+                )
+            else:
+                similarities = _cos_matrix(
+                    book_embeddings,
+                    self._cat_matrix[category_index:category_index + 1]
+                ).ravel()
+
+            # Índices en `books` y puntajes en arreglos paralelos: los diccionarios no se copian ni modifican
+            matching = similarities >= threshold
+            keep_idx = np.asarray(valid_indices)[matching]
+            keep_scores = similarities[matching]
+            if keep_idx.size == 0:
+                return []
+
+            # Top 5 por similitud con selección parcial O(N) en lugar de ordenar todos los resultados
+            k = min(5, keep_scores.size)  # Máximo 5 resultados
+            top = np.argpartition(-keep_scores, k - 1)[:k]
+            # Ordenar solo los k elegidos; a igual similitud se respeta el orden original
+            top = top[np.lexsort((top, -keep_scores[top]))]
+
+            return [books[i] for i in keep_idx[top]]
 
-                similarity = cosine_similarity(
-                    [book_embedding],
-                    [category_embedding]
-                )[0][0]
+        except Exception as e:
+            logger.error(f"Error en búsqueda semántica de libros: {e}")
+            return self._rule_based_book_filter(books, target_category)
 
-                if similarity >= threshold:
-                    book_with_score = book.copy()
-                    book_with_score['_semantic_score'] = similarity
-                    matching_books.append(book_with_score)
+    def _get_book_payload(self, book: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Devuelve la entrada en caché del libro, creándola en el primer encuentro.
+        Se indexa por id (o por identidad del diccionario si no tiene) y se regenera
+        si cambió el título o la descripción.
 
-            # Ordenar por similitud semántica
-            matching_books.sort(key=lambda x: x.get('_semantic_score', 0), reverse=True)
+        Returns:
+            Diccionario con text, text_lower, embedding (None hasta codificarlo) y scale
+        """
+        name = book.get('name', '')
+        description = book.get('description', '')
+        key = self._book_key(book)
+
+        with self._book_cache_lock:
+            payload = self._book_cache.get(key)
+            if payload is not None and payload["name"] == name and payload["description"] == description:
+                self._book_cache.move_to_end(key)
+                return payload
+
+            text = f"{name} {description}"
+            payload = {
+                "name": name,
+                "description": description,
+                "text": text,
+                "text_lower": text.lower(),
+                "embedding": None,
+                "scale": 1.0
+            }
+            self._book_cache[key] = payload
+            self._book_cache.move_to_end(key)
+
+        return payload
+
+    @staticmethod
+    def _book_key(book: Dict[str, Any]) -> Any:
+        """Clave de caché del libro: su id o, si no tiene, la identidad del diccionario."""
+        return book.get('id') or id(book)
+
+    def _trim_book_cache(self, keep: Set[Any]):
+        """
+        Recorta la caché de libros a BOOK_CACHE_SIZE sin expulsar las entradas de la llamada
+        actual (`keep`). Así un catálogo mayor que el límite no se expulsa a sí mismo en cada
+        recorrido; la caché crece temporalmente hasta el tamaño de ese catálogo.
+        """
+        with self._book_cache_lock:
+            excess = len(self._book_cache) - BOOK_CACHE_SIZE
+            if excess <= 0:
+                return
+
+            if len(keep) > BOOK_CACHE_SIZE and not self._book_cache_warned:
+                logger.warning(
+                    f"Se recibieron {len(keep)} libros y SEMANTIC_BOOK_CACHE_SIZE es {BOOK_CACHE_SIZE}; "
+                    f"la caché de libros excederá el límite"
+                )
+                self._book_cache_warned = True
+
+            # De la entrada usada hace más tiempo a la más reciente
+            victims = []
+            for key in self._book_cache:
+                if len(victims) == excess:
+                    break
+                if key not in keep:
+                    victims.append(key)
+            for key in victims:
+                del self._book_cache[key]
+
+    def _encode_books(self, payloads: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene los embeddings normalizados de los libros.
+        Reutiliza los guardados en su entrada de caché; solo los libros nuevos
+        o modificados pasan por el modelo, todos en una sola llamada por lotes.
 
-            # Remover el score antes de devolver
-            for book in matching_books:
-                book.pop('_semantic_score', None)
+        Returns:
+            Tupla de (matriz de embeddings, escalas por fila). Con quantize_embeddings
+            la matriz es int8; si no, es float32 y las escalas valen 1.
+        """
+        missing = [payload for payload in payloads if payload["embedding"] is None]
+
+        if missing:
+            # Todos los libros pendientes van en una sola llamada: encode ordena internamente
+            # los textos por longitud antes de armar los lotes (y restaura el orden al final),
+            # así cada lote agrupa textos de tamaño parecido y se desperdicia poco relleno
+            encoded = self.model.encode(
+                [payload["text"] for payload in missing],
+                batch_size=32,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            encoded = np.asarray(encoded, dtype=np.float32)
+            if self.quantize_embeddings:
+                encoded, encoded_scales = _quantize(encoded)
+            else:
+                encoded_scales = np.ones(len(missing), dtype=np.float32)
 
-            return matching_books[:5]  # Máximo 5 resultados
+            for payload, embedding, scale in zip(missing, encoded, encoded_scales):
+                payload["scale"] = float(scale)
+                payload["embedding"] = embedding
 
-        except Exception as e:
-            logger.error(f"Error en búsqueda semántica de libros: {e}")
-            return self._rule_based_book_filter(books, target_category)
+        embeddings = np.vstack([payload["embedding"] for payload in payloads])
+        scales = np.array([payload["scale"] for payload in payloads], dtype=np.float32)
+        return embeddings, scales
 
     def _rule_based_book_filter(self, books: List[Dict[str, Any]], target_category: str) -> List[Dict[str, Any]]:
         """Filtro de libros basado en reglas como fallback."""
-        if target_category not in self.academic_categories:
+        if target_category not in self._academic_categories_lc:
             return []
 
-        keywords = self.academic_categories[target_category]
+        matcher = self._book_keyword_matchers[target_category]
         matching_books = []
+        visited = set()
 
         for book in books:
-            book_text = f"{book.get('name', '')} {book.get('description', '')}".lower()
-
-            if any(keyword.lower() in book_text for keyword in keywords):
+            visited.add(self._book_key(book))
+            if matcher.match(self._get_book_payload(book)["text_lower"]):
                 matching_books.append(book)
+                if len(matching_books) == 5:  # Máximo 5 resultados
+                    break
 
-        return matching_books[:5]
+        self._trim_book_cache(visited)
+        return matching_books
 
-# Instancia global del clasificador
-semantic_classifier = SemanticClassifier()
\ No newline at end of file
+@functools.cache
+def get_semantic_classifier() -> SemanticClassifier:
+    """Instancia compartida del clasificador, creada en el primer uso y no al importar el módulo."""
+    return SemanticClassifier()
\ No newline at end of file